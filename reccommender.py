@@ -3,20 +3,58 @@ This module features the ImplicitRecommender class that performs
 recommendation using the implicit library.
 """
 
+from functools import lru_cache
 from pathlib import Path
-from typing import Tuple, List
+from typing import NamedTuple, Optional, Tuple, List
+import hashlib
 import logging
+import sys
 
 import implicit
+import numpy as np
 import scipy.sparse as sp
+from threadpoolctl import threadpool_limits
 
-from musiccollaborativefiltering.data import load_user_artists, ArtistRetriever
+from musiccollaborativefiltering.data import cached_load_user_artists, ArtistRetriever
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class _IdIndex(NamedTuple):
+    """
+    Lookup from IDs back to their positions in an (unsorted) ID array.
+
+    Memory scales with the number of IDs present, not with the largest ID.
+
+    Attributes:
+        - sorted_ids: the IDs in ascending order
+        - order: the position in the original array of each sorted ID
+    """
+
+    sorted_ids: np.ndarray
+    order: np.ndarray
+
+    @classmethod
+    def build(cls, ids: np.ndarray) -> "_IdIndex":
+        order = np.argsort(ids, kind="stable")
+        return cls(ids[order], order)
+
+    def positions(self, ids: np.ndarray) -> np.ndarray:
+        """
+        Return the position of each of `ids`, with -1 for IDs not present.
+        """
+        ids = np.asarray(ids)
+        if len(self.sorted_ids) == 0:
+            return np.full(ids.shape, -1, dtype=np.int64)
+
+        found_at = np.searchsorted(self.sorted_ids, ids)
+        found_at = np.minimum(found_at, len(self.sorted_ids) - 1)
+        found = self.sorted_ids[found_at] == ids
+        return np.where(found, self.order[found_at], -1)
+
+
 class ImplicitRecommender:
     """
     The ImplicitRecommender class computes recommendations for a given user
@@ -25,6 +63,9 @@ class ImplicitRecommender:
     Attributes:
         - artist_retriever: an ArtistRetriever instance
         - implicit_model: an implicit model (e.g., ALS, BPR)
+        - user_ids: the user ID of each matrix row
+        - artist_ids: the artist ID of each matrix column
+        - user_artists_csc: CSC copy of the matrix for per-artist access
     """
 
     def __init__(
@@ -35,16 +76,134 @@ class ImplicitRecommender:
         self.artist_retriever = artist_retriever
         self.implicit_model = implicit_model
         self.user_artists_matrix: sp.csr_matrix = None
+        self.user_artists_csc: sp.csc_matrix = None
+        self.user_ids: Optional[np.ndarray] = None
+        self.artist_ids: Optional[np.ndarray] = None
+        self._user_index: Optional[_IdIndex] = None
+        self._artist_index: Optional[_IdIndex] = None
+        # Cached per instance, so recommenders never share results.
+        self._recommend_cached = lru_cache(maxsize=10000)(self._recommend)
 
-    def fit(self, user_artists_matrix: sp.csr_matrix) -> None:
+    def fit(
+        self,
+        user_artists_matrix: sp.csr_matrix,
+        user_ids: Optional[np.ndarray] = None,
+        artist_ids: Optional[np.ndarray] = None,
+    ) -> None:
         """
         Fit the implicit model to the user-artists sparse matrix.
+
+        `user_ids` and `artist_ids` give the ID behind each row and column when
+        the matrix is not indexed by ID directly (e.g., after compaction).
         """
         logger.info("Fitting model to user-artist data...")
-        self.user_artists_matrix = user_artists_matrix
+        self._set_user_artists(user_artists_matrix, user_ids, artist_ids)
         self.implicit_model.fit(user_artists_matrix)
         logger.info("Model fitting completed.")
 
+    def fit_or_load(
+        self,
+        user_artists_matrix: sp.csr_matrix,
+        cache_dir: Path,
+        user_ids: Optional[np.ndarray] = None,
+        artist_ids: Optional[np.ndarray] = None,
+    ) -> None:
+        """
+        Fit the implicit model, reusing factors cached in `cache_dir` when the
+        same matrix was already fitted with the same hyperparameters.
+        """
+        cache_file = cache_dir / f"{self._cache_key(user_artists_matrix)}.npz"
+        # GPU models hold their factors in device memory and expose to_cpu().
+        on_gpu = hasattr(self.implicit_model, "to_cpu")
+
+        if cache_file.exists():
+            logger.info(f"Loading cached model factors from: {cache_file}")
+            with np.load(cache_file) as factors:
+                user_factors = factors["user_factors"]
+                item_factors = factors["item_factors"]
+            if on_gpu:
+                user_factors = implicit.gpu.Matrix(user_factors)
+                item_factors = implicit.gpu.Matrix(item_factors)
+            self.implicit_model.user_factors = user_factors
+            self.implicit_model.item_factors = item_factors
+            self._set_user_artists(user_artists_matrix, user_ids, artist_ids)
+            return
+
+        self.fit(user_artists_matrix, user_ids, artist_ids)
+
+        cpu_model = self.implicit_model.to_cpu() if on_gpu else self.implicit_model
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        np.savez(
+            cache_file,
+            user_factors=cpu_model.user_factors,
+            item_factors=cpu_model.item_factors,
+        )
+        logger.info(f"Cached model factors to: {cache_file}")
+
+    def _cache_key(self, user_artists_matrix: sp.csr_matrix) -> str:
+        """
+        Hash the model hyperparameters together with the matrix contents, so
+        any change to either the data or the model invalidates the cache.
+        """
+        model = self.implicit_model
+        hyperparameters = (
+            "factors",
+            "regularization",
+            "alpha",
+            "iterations",
+            "cg_steps",
+            "use_cg",
+            "random_state",
+        )
+        params = [type(model).__name__] + [
+            f"{name}={getattr(model, name, None)}" for name in hyperparameters
+        ]
+
+        key = hashlib.sha1("-".join(params).encode())
+        key.update(str(user_artists_matrix.shape).encode())
+        for array in (
+            user_artists_matrix.indptr,
+            user_artists_matrix.indices,
+            user_artists_matrix.data,
+        ):
+            key.update(np.ascontiguousarray(array))
+        return key.hexdigest()
+
+    def _set_user_artists(
+        self,
+        user_artists_matrix: sp.csr_matrix,
+        user_ids: Optional[np.ndarray],
+        artist_ids: Optional[np.ndarray],
+    ) -> None:
+        """
+        Store the matrix and its row/column ID mappings.
+        """
+        n_users, n_artists = user_artists_matrix.shape
+        self.user_artists_matrix = user_artists_matrix
+        self.user_artists_csc = user_artists_matrix.tocsc()
+        self.user_ids = np.arange(n_users) if user_ids is None else user_ids
+        self.artist_ids = np.arange(n_artists) if artist_ids is None else artist_ids
+
+        self._user_index = _IdIndex.build(self.user_ids)
+        self._artist_index = _IdIndex.build(self.artist_ids)
+        # Recommendations from a previous fit are stale now.
+        self._recommend_cached.cache_clear()
+
+    def listeners_of_artist(self, artist_id: int) -> np.ndarray:
+        """
+        Return the IDs of the users who listened to the given `artist_id`.
+        """
+        if self.user_artists_csc is None:
+            raise ValueError("Model has not been fitted yet.")
+
+        column = int(self._artist_index.positions(artist_id))
+        if column < 0:
+            raise IndexError(f"artist_id {artist_id} is out of bounds.")
+
+        indptr = self.user_artists_csc.indptr
+        rows = self.user_artists_csc.indices[indptr[column] : indptr[column + 1]]
+        return self.user_ids[rows]
+
     def recommend(
         self,
         user_id: int,
@@ -60,34 +219,84 @@ class ImplicitRecommender:
         if self.user_artists_matrix is None:
             raise ValueError("Model has not been fitted yet.")
 
-        if user_id >= self.user_artists_matrix.shape[0]:
+        if self._user_index.positions(user_id) < 0:
             raise IndexError(f"user_id {user_id} is out of bounds.")
 
         logger.info(f"Generating top {n} recommendations for user {user_id}...")
 
         try:
-            artist_ids, scores = self.implicit_model.recommend(
-                user_id, self.user_artists_matrix[user_id], N=n
-            )
-            artists = [
-                self.artist_retriever.get_artist_name_from_id(artist_id)
-                for artist_id in artist_ids
-            ]
+            artists, scores = self._recommend_cached(int(user_id), n)
         except Exception as e:
             logger.error(f"Error generating recommendations: {e}")
             return [], []
 
         logger.info("Recommendation generation completed.")
-        return artists, scores
+        return list(artists), list(scores)
+
+    def _recommend(
+        self,
+        user_id: int,
+        n: int,
+    ) -> Tuple[Tuple[str, ...], Tuple[float, ...]]:
+        """
+        Compute the recommendations behind `recommend`. Results are returned as
+        tuples so the cached copies cannot be mutated by callers.
+        """
+        row = int(self._user_index.positions(user_id))
+        columns, scores = self.implicit_model.recommend(
+            row, self.user_artists_matrix[row], N=n
+        )
+        artist_ids = self.artist_ids[columns]
+        artists = self.artist_retriever.get_names(artist_ids)
+        return tuple(artists.tolist()), tuple(scores.tolist())
+
+    def recommend_many(
+        self,
+        user_ids: np.ndarray,
+        n: int = 10,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the top `n` recommendations for each user in `user_ids` at once.
+
+        All users are scored in a single batched call to the model, instead of
+        one call per user as with `recommend`.
+
+        Returns:
+            - Array of recommended artist names, one row per user
+            - Array of associated confidence scores, one row per user
+        """
+        if self.user_artists_matrix is None:
+            raise ValueError("Model has not been fitted yet.")
+
+        rows = self._user_index.positions(user_ids)
+        if (rows < 0).any():
+            raise IndexError("user_ids contains out of bounds IDs.")
+
+        logger.info(f"Generating top {n} recommendations for {len(rows)} users...")
+
+        try:
+            columns, scores = self.implicit_model.recommend(
+                rows, self.user_artists_matrix[rows], N=n
+            )
+            artist_ids = self.artist_ids[columns]
+            artists = self.artist_retriever.get_names(artist_ids.ravel())
+        except Exception as e:
+            logger.error(f"Error generating recommendations: {e}")
+            return np.empty((0, n), dtype=object), np.empty((0, n))
+
+        logger.info("Recommendation generation completed.")
+        return artists.reshape(artist_ids.shape), scores
 
     def recommend_pretty_print(self, user_id: int, n: int = 10) -> None:
         """
         Print recommendations in a user-friendly format.
         """
         artists, scores = self.recommend(user_id, n)
-        print(f"\nTop {n} recommendations for user {user_id}:\n")
-        for i, (artist, score) in enumerate(zip(artists, scores), start=1):
-            print(f"{i}. {artist} — Score: {score:.3f}")
+        lines = ["", f"Top {n} recommendations for user {user_id}:", ""] + [
+            f"{i}. {artist} — Score: {score:.3f}"
+            for i, (artist, score) in enumerate(zip(artists, scores), start=1)
+        ]
+        sys.stdout.write("\n".join(lines) + "\n")
 
 
 def main():
@@ -98,13 +307,16 @@ def main():
 
     # Load data
     logger.info("Loading user-artist interaction data...")
-    user_artists = load_user_artists(user_artists_path)
+    user_artists, user_ids, artist_ids = cached_load_user_artists(user_artists_path)
 
     logger.info("Loading artist metadata...")
     artist_retriever = ArtistRetriever()
     artist_retriever.load_artists(artists_path)
 
-    # Create ALS model
+    # Create ALS model. implicit already spreads the per-user least-squares
+    # solves across all cores with OpenMP, so BLAS is pinned to one thread to
+    # avoid nested parallelism oversubscribing the cores.
+    threadpool_limits(1, "blas")
     als_model = implicit.als.AlternatingLeastSquares(
         factors=64,
         regularization=0.05,
@@ -114,7 +326,7 @@ def main():
 
     # Train and recommend
     recommender = ImplicitRecommender(artist_retriever, als_model)
-    recommender.fit(user_artists)
+    recommender.fit_or_load(user_artists, data_dir / ".cache", user_ids, artist_ids)
     recommender.recommend_pretty_print(user_id=2, n=5)
 
 
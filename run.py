@@ -1,28 +1,52 @@
 from pathlib import Path
+import argparse
 
-from musiccollaborativefiltering.data import load_user_artists, ArtistRetriever
+from musiccollaborativefiltering.data import cached_load_user_artists, ArtistRetriever
 from musiccollaborativefiltering.recommender import ImplicitRecommender
+from musiccollaborativefiltering.tiled_als import TiledAlternatingLeastSquares
 
 import implicit
+from threadpoolctl import threadpool_limits
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Recommend artists with ALS.")
+    parser.add_argument(
+        "--tiled",
+        action="store_true",
+        help="use the experimental block-tiled ALS backend instead of implicit",
+    )
+    args = parser.parse_args()
+
     # === Load Data ===
     user_artists_path = Path("lastfmdata/user_artists_sample.dat")
     artists_path = Path("lastfmdata/artists_sample.dat")
 
-    user_artists = load_user_artists(user_artists_path)
+    user_artists, user_ids, artist_ids = cached_load_user_artists(user_artists_path)
 
     retriever = ArtistRetriever()
     retriever.load_artists(artists_path)
 
     # === Train ALS Model ===
-    model = implicit.als.AlternatingLeastSquares(
-        factors=64, regularization=0.05, iterations=15
-    )
+    if args.tiled:
+        # The tiled backend's only parallelism is BLAS, so leave it unpinned.
+        model = TiledAlternatingLeastSquares(
+            factors=64, regularization=0.05, iterations=15
+        )
+    else:
+        # implicit already spreads the per-user solves across all cores with
+        # OpenMP; pin BLAS to one thread so the two don't oversubscribe them.
+        threadpool_limits(1, "blas")
+        model = implicit.als.AlternatingLeastSquares(
+            factors=64,
+            regularization=0.05,
+            iterations=15,
+        )
 
     recommender = ImplicitRecommender(retriever, model)
-    recommender.fit(user_artists)
+    recommender.fit_or_load(
+        user_artists, user_artists_path.parent / ".cache", user_ids, artist_ids
+    )
 
     # === Recommend for a user ===
     user_id = 2